@@ -0,0 +1,48 @@
+# D:/AI/AICompanion/ai_server/ai_model_host.py
+"""
+공용 모델 호스트 데몬.
+  python ai_model_host.py [--socket /tmp/ai_companion_models.sock] [--llm skt/kogpt2-base-v2]
+그 다음 AI_MODEL_HOST_SOCKET 환경변수를 준 채로 ai_server.py / ai_server_ws.py 실행.
+"""
+import os
+os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
+
+import argparse
+from pathlib import Path
+
+from modules.model_host import ModelHostServer, DEFAULT_SOCKET
+
+BASE_DIR = Path(__file__).resolve().parent
+TTS_DIR = BASE_DIR / "tts_cache"  # 프런트 서버들과 같은 폴더 (/tts_file 에서 그대로 제공)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Shared STT/LLM/TTS model host")
+    ap.add_argument("--socket", default=DEFAULT_SOCKET)
+    ap.add_argument("--model-size", default="small")
+    ap.add_argument("--device", default="cpu")
+    ap.add_argument("--compute-type", default="int8")
+    ap.add_argument("--llm", default=None, help="LLM 모델 이름 (없으면 STT/TTS만)")
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+
+    server = ModelHostServer(
+        socket_path=args.socket,
+        tts_dir=TTS_DIR,
+        model_size=args.model_size,
+        device=args.device,
+        compute_type=args.compute_type,
+        llm_model=args.llm,
+        max_workers=args.workers,
+    )
+    try:
+        server.serve_forever()
+    except RuntimeError as e:
+        raise SystemExit(f"[ModelHost] {e}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
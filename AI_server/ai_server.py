@@ -2,13 +2,20 @@
 import os
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
+import hashlib
+import json
 import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
-from flask import Flask, jsonify, send_file, request
+from flask import Flask, Response, jsonify, send_file, request, stream_with_context
 
-from modules.stt_module import WhisperSTT, RealtimeSpeechEngine
-from modules.tts_edge import EdgeTTSWrapper
+from modules.stt_module import RealtimeSpeechEngine
+from modules.tts_edge import mimetype_for
+from modules.emotion_module import EmotionBatcher
+from modules.reply_module import simple_rule_reply
+from modules.model_host import ModelHostClient
+from modules.event_bus import EventBus
 
 
 # -----------------------------
@@ -24,9 +31,21 @@ TTS_DIR.mkdir(exist_ok=True)
 # -----------------------------
 # Engines (전역 1회 로드)
 # -----------------------------
-stt = WhisperSTT(model_size="small", device="cpu", compute_type="int8")
+# AI_MODEL_HOST_SOCKET이 있으면 ai_model_host.py의 공용 모델을 사용 (이 프로세스는 로드 안 함)
+MODEL_HOST_SOCKET = os.environ.get("AI_MODEL_HOST_SOCKET")
+if MODEL_HOST_SOCKET:
+    model_host = ModelHostClient(MODEL_HOST_SOCKET)
+    stt = model_host.stt
+    edge_tts_engine = model_host.tts
+else:
+    # 로컬 모델 모드에서만 엔진 모듈 import
+    from modules.stt_module import WhisperSTT
+    from modules.tts_edge import EdgeTTSWrapper
+
+    stt = WhisperSTT(model_size="small", device="cpu", compute_type="int8")
+    edge_tts_engine = EdgeTTSWrapper(output_dir=TTS_DIR, voice="ko-KR-SunHiNeural", rate="+0%", pitch="+0%")
 rt = None  # /realtime/start 시점에 생성
-edge_tts_engine = EdgeTTSWrapper(output_dir=TTS_DIR, voice="ko-KR-SunHiNeural", rate="+0%", pitch="+0%")
+emotion = EmotionBatcher(max_batch=32, max_wait_sec=0.01)  # CPU 감정 분류 (요청 간 배치)
 
 pipeline_lock = threading.Lock()
 
@@ -36,16 +55,94 @@ last_result = {
     "tts_url": None,
     "language": None
 }
+last_result_lock = threading.Lock()
+
+# 단계 이벤트 push (/realtime/events SSE, /realtime/events/poll long-poll)
+events = EventBus(history=256, subscriber_maxsize=64)
 
 
 # -----------------------------
 # 유틸
 # -----------------------------
-def make_tts_and_url(reply_text: str):
-    out_path = edge_tts_engine.synthesize(reply_text)
+def set_last_result(**result):
+    with last_result_lock:
+        last_result.update(result)
+
+
+def get_last_result() -> dict:
+    with last_result_lock:
+        return dict(last_result)
+
+
+def guess_language(text: str) -> str:
+    # 한글이 하나라도 있으면 ko
+    return "ko" if any("\uac00" <= ch <= "\ud7a3" for ch in text) else "en"
+
+
+# Accept 헤더 mimetype -> TTS 포맷 (압축률 좋은 순서로 검사)
+_ACCEPT_FORMATS = [("audio/ogg", "opus"), ("audio/opus", "opus"), ("audio/mpeg", "mp3"), ("audio/wav", "wav")]
+
+
+def pick_tts_format():
+    """
+    /pipeline, /realtime/start 용 TTS 포맷 선택. 실제로 만들 수 있는 포맷(edge_tts_engine.formats)만 고름.
+    - 권장: ?format=mp3|opus|wav
+    - 없으면 Accept 헤더를 "원하는 오디오 포맷"으로 해석 (응답 자체는 JSON이라 일반적인 콘텐츠 협상과는 다름)
+      예) Accept: audio/ogg;codecs=opus, audio/mpeg;q=0.5 -> opus
+    - 둘 다 없으면 mp3 (edge-tts 원본)
+    """
+    available = edge_tts_engine.formats
+    fmt = request.args.get("format")
+    if fmt:
+        if fmt not in available:
+            raise ValueError(f"unsupported format: {fmt} (use one of {', '.join(available)})")
+        return fmt
+    # 헤더에 명시된 것만 고려 ("*/*"만 보내는 클라이언트는 mp3), ";codecs=..." 등 파라미터는 떼고 비교
+    accepted = {}
+    for value, quality in request.accept_mimetypes:
+        mime = value.split(";")[0].strip().lower()
+        accepted[mime] = max(accepted.get(mime, 0), quality)
+    candidates = [
+        (accepted[mime], -i, name)
+        for i, (mime, name) in enumerate(_ACCEPT_FORMATS)
+        if name in available and accepted.get(mime, 0) > 0
+    ]
+    return max(candidates)[2] if candidates else "mp3"
+
+
+def make_tts_and_url(reply_text: str, fmt: str = "mp3"):
+    out_path = edge_tts_engine.synthesize(reply_text, fmt=fmt)
     return f"/tts_file/{out_path.name}"
 
 
+# 파일 내용 해시 캐시 (LRU): name -> ((mtime_ns, size), sha256)
+ETAG_CACHE_SIZE = 1024
+_etag_cache = OrderedDict()
+_etag_lock = threading.Lock()
+
+
+def file_etag(path: Path) -> str:
+    st = path.stat()
+    key = (st.st_mtime_ns, st.st_size)
+    with _etag_lock:
+        hit = _etag_cache.get(path.name)
+        if hit and hit[0] == key:
+            _etag_cache.move_to_end(path.name)
+            return hit[1]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _etag_lock:
+        _etag_cache[path.name] = (key, digest)
+        _etag_cache.move_to_end(path.name)
+        while len(_etag_cache) > ETAG_CACHE_SIZE:
+            _etag_cache.popitem(last=False)
+    return digest
+
+
 # -----------------------------
 # 1) 파이프라인
 # -----------------------------
@@ -55,6 +152,11 @@ def pipeline():
         return jsonify({"ok": False, "error": "Pipeline busy"}), 409
 
     try:
+        try:
+            tts_format = pick_tts_format()
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+
         mode = request.args.get("mode", "utterance")  # "utterance" | "timer"
         samplerate = int(request.args.get("samplerate", "16000"))
 
@@ -69,7 +171,8 @@ def pipeline():
                 samplerate=samplerate,
                 vad_mode="auto",
                 min_utt_sec=1.5,
-                end_silence_sec=1.0
+                end_silence_sec=1.0,
+                on_speech_start=lambda: events.publish("speech_start", source="pipeline")
             )
             try:
                 audio = engine.get_utterance_blocking()
@@ -80,21 +183,20 @@ def pipeline():
                 print("[Pipeline] No speech detected (timeout or silence)")
                 return jsonify({"ok": False, "error": "No speech detected"}), 400
 
+            events.publish("speech_end", source="pipeline", seconds=len(audio) / samplerate)
             text, lang = stt.transcribe_numpy(audio, samplerate=samplerate)
 
         if not text:
             print("[Pipeline] Empty STT result")
             return jsonify({"ok": False, "error": "Empty STT result"}), 400
+        events.publish("transcript", source="pipeline", text=text, language=lang)
 
-        reply = make_simple_reply(text, lang)
-        tts_url = make_tts_and_url(reply)
+        reply = simple_rule_reply(text, lang)
+        events.publish("reply", source="pipeline", reply=reply)
+        tts_url = make_tts_and_url(reply, fmt=tts_format)
+        events.publish("tts", source="pipeline", tts_url=tts_url)
 
-        last_result.update({
-            "user_text": text,
-            "reply": reply,
-            "tts_url": tts_url,
-            "language": lang
-        })
+        set_last_result(user_text=text, reply=reply, tts_url=tts_url, language=lang)
         print(f"[Pipeline] User='{text}' | Reply='{reply}'")
 
         return jsonify({
@@ -115,6 +217,48 @@ def pipeline():
         pipeline_lock.release()
 
 
+# -----------------------------
+# 1-1) 텍스트 채팅 (STT 없이 바로 답변 + 감정)
+# -----------------------------
+@app.route("/chat", methods=["POST"])
+def chat():
+    """
+    node_controller용: {"text": "..."} -> {"reply", "emotion"}
+    - pipeline_lock을 쓰지 않으므로 여러 요청이 동시에 처리됨
+    - 감정 분류는 답변 생성과 동시에 진행 (요청 간 배치)
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "error": "JSON object body is required"}), 400
+    text = data.get("text")
+    if not isinstance(text, str) or not text.strip():
+        return jsonify({"ok": False, "error": "text is required"}), 400
+    text = text.strip()
+    lang = data.get("language")
+    if lang is not None and not isinstance(lang, str):
+        return jsonify({"ok": False, "error": "language must be a string"}), 400
+
+    try:
+        lang = lang or guess_language(text)
+        emotion_future = emotion.submit(text)
+        reply = simple_rule_reply(text, lang)
+        label = emotion_future.result(timeout=2.0)
+
+        print(f"[Chat] User='{text}' | Reply='{reply}' | Emotion={label}")
+        return jsonify({
+            "ok": True,
+            "language": lang,
+            "user_text": text,
+            "reply": reply,
+            "emotion": label
+        })
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+
 # -----------------------------
 # 2) 실시간 루프
 # -----------------------------
@@ -123,9 +267,13 @@ realtime_running = False
 realtime_lock = threading.Lock()
 
 
-def realtime_loop(samplerate=16000):
+def realtime_loop(samplerate=16000, tts_format="mp3"):
     global realtime_running, rt
-    rt = RealtimeSpeechEngine(samplerate=samplerate, vad_mode="auto", min_utt_sec=1.5, end_silence_sec=1.0)
+    rt = RealtimeSpeechEngine(
+        samplerate=samplerate, vad_mode="auto", min_utt_sec=1.5, end_silence_sec=1.0,
+        on_speech_start=lambda: events.publish("speech_start", source="realtime")
+    )
+    events.publish("status", source="realtime", msg="listening")
     try:
         while realtime_running:
             audio = rt.get_utterance_blocking()  # timeout 추가
@@ -133,30 +281,43 @@ def realtime_loop(samplerate=16000):
                 break
             if audio is None or len(audio) == 0:
                 continue
+            events.publish("speech_end", source="realtime", seconds=len(audio) / samplerate)
 
             text, lang = stt.transcribe_numpy(audio, samplerate=samplerate)
             if not text:
                 continue
+            events.publish("transcript", source="realtime", text=text, language=lang)
 
-            reply = make_simple_reply(text, lang)
-            tts_url = make_tts_and_url(reply)
+            reply = simple_rule_reply(text, lang)
+            events.publish("reply", source="realtime", reply=reply)
+            tts_url = make_tts_and_url(reply, fmt=tts_format)
+            events.publish("tts", source="realtime", tts_url=tts_url)
 
-            last_result.update({"user_text": text, "reply": reply, "tts_url": tts_url, "language": lang})
+            set_last_result(user_text=text, reply=reply, tts_url=tts_url, language=lang)
             print(f"[Realtime] User='{text}' | Reply='{reply}'")
     finally:
         if rt:
             rt.stop()
             rt = None
+        events.publish("status", source="realtime", msg="stopped")
 
 
 @app.route("/realtime/start", methods=["POST"])
 def realtime_start():
     global realtime_thread, realtime_running
+    try:
+        tts_format = pick_tts_format()
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
     with realtime_lock:
         if realtime_running:
             return jsonify({"ok": True, "msg": "already running"})
         realtime_running = True
-        realtime_thread = threading.Thread(target=realtime_loop, kwargs={"samplerate": 16000}, daemon=True)
+        realtime_thread = threading.Thread(
+            target=realtime_loop,
+            kwargs={"samplerate": 16000, "tts_format": tts_format},
+            daemon=True,
+        )
         realtime_thread.start()
         return jsonify({"ok": True})
 
@@ -179,23 +340,101 @@ def realtime_status():
     return jsonify({
         "ok": True,
         "is_running": bool(realtime_running),
-        "last": last_result
+        "last": get_last_result(),
+        "last_event_id": events.seq
+    })
+
+
+SSE_HEARTBEAT_SEC = 15.0
+
+
+def _sse_format(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+@app.route("/realtime/events", methods=["GET"])
+def realtime_events():
+    """
+    SSE 스트림: 단계 이벤트를 발생 즉시 push (폴링 불필요)
+    - 재접속 시 Last-Event-ID 헤더(또는 ?last_id=)로 놓친 이벤트 이어받기
+      (이어받을 수 없으면 "reset" 이벤트 후 남아 있는 이벤트 전체)
+    - 구독자 버퍼는 크기 제한, 느린 클라이언트는 오래된 이벤트부터 버려짐 (그 자리에 "reset" 이벤트로 알림)
+    """
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return jsonify({"ok": False, "error": "last_id must be an integer"}), 400
+    sub = events.subscribe(last_id=last_id)
+
+    def stream():
+        try:
+            yield "retry: 2000\n\n"
+            while True:
+                event = sub.get(timeout=SSE_HEARTBEAT_SEC)
+                if event is None:
+                    yield ": keep-alive\n\n"  # 끊긴 연결 감지용
+                    continue
+                yield _sse_format(event)
+        finally:
+            sub.close()
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/realtime/events/poll", methods=["GET"])
+def realtime_events_poll():
+    """
+    long-poll: ?after=<마지막으로 받은 id>&timeout=25
+    새 이벤트가 생기면 바로, 없으면 timeout 후 빈 목록 반환
+    - gap=True: after부터 이어받을 수 없음 (서버 재시작/너무 오래됨) -> 남아 있는 이벤트 전체를 바로 반환
+    """
+    try:
+        after = int(request.args.get("after", events.seq))
+        timeout = float(request.args.get("timeout", "25"))
+    except ValueError:
+        return jsonify({"ok": False, "error": "after must be an integer, timeout a number"}), 400
+    timeout = min(max(timeout, 0.0), 60.0)
+
+    got, gap = events.events_after(after, timeout=timeout)
+    return jsonify({
+        "ok": True,
+        "events": got,
+        "gap": gap,
+        "last_event_id": events.seq if gap else (got[-1]["id"] if got else after)
     })
 
 
 # -----------------------------
 # 3) TTS 파일 제공
 # -----------------------------
+TTS_MAX_AGE = 60 * 60 * 24  # 파일명이 매번 새로 생성되므로 내용이 바뀌지 않음
+
+
 @app.route("/tts_file/<fname>", methods=["GET"])
 def tts_file(fname):
     f = TTS_DIR / fname
-    if not f.exists():
+    if not f.is_file():
         return jsonify({"ok": False, "error": "file not found"}), 404
-    return send_file(str(f), mimetype="audio/wav")
+    # conditional=True: If-None-Match -> 304, Range -> 206 (앞부분부터 바로 재생)
+    resp = send_file(
+        str(f),
+        mimetype=mimetype_for(f),
+        conditional=True,
+        etag=file_etag(f),
+        max_age=TTS_MAX_AGE,
+    )
+    resp.cache_control.immutable = True
+    return resp
 
 
 # -----------------------------
 # RUN
 # -----------------------------
 if __name__ == "__main__":
-    app.run(host="127.0.0.1", port=5000, debug=True)
+    # threaded=True는 Flask 기본값 (명시용). /chat은 pipeline_lock을 안 잡으므로 요청이 동시에 처리됨
+    app.run(host="127.0.0.1", port=5000, debug=True, threaded=True)
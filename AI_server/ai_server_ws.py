@@ -9,14 +9,10 @@ from pathlib import Path
 import websockets
 from websockets.server import serve
 
-from modules.stt_module import WhisperSTT, RealtimeSpeechEngine
-try:
-    from modules.llm_module import LLMEngine
-    _HAVE_LLM = True
-except Exception:
-    _HAVE_LLM = False
-
-from modules.tts_edge import EdgeTTSWrapper  # voice: ko-KR-SunHiNeural 등
+from modules.stt_module import RealtimeSpeechEngine
+from modules.tts_edge import mimetype_for
+from modules.model_host import ModelHostClient
+from modules.reply_module import simple_rule_reply
 
 # -----------------------------
 # Paths & engines (1회 로드)
@@ -25,47 +21,49 @@ BASE_DIR = Path(__file__).resolve().parent
 TTS_DIR = BASE_DIR / "tts_cache"
 TTS_DIR.mkdir(exist_ok=True)
 
-# STT: faster-whisper (CPU int8 기본)
-stt = WhisperSTT(model_size="small", device="cpu", compute_type="int8")
-
-# LLM: 있으면 사용, 없으면 규칙기반
-llm = None
-if _HAVE_LLM:
+MODEL_HOST_SOCKET = os.environ.get("AI_MODEL_HOST_SOCKET")
+if MODEL_HOST_SOCKET:
+    # ai_model_host.py의 공용 모델 사용 (STT/LLM/TTS를 이 프로세스에서 로드하지 않음)
+    model_host = ModelHostClient(MODEL_HOST_SOCKET)
+    stt = model_host.stt
+    llm = model_host.llm  # 호스트에 LLM이 없으면 None -> 규칙기반
+    tts = model_host.tts
+else:
+    # 로컬 모델 모드에서만 엔진 모듈 import (호스트 모드는 torch/faster_whisper를 올리지 않음)
+    from modules.stt_module import WhisperSTT
+    from modules.tts_edge import EdgeTTSWrapper  # voice: ko-KR-SunHiNeural 등
     try:
-        llm = LLMEngine(model_name="skt/kogpt2-base-v2")  # 원하면 바꿔도 됨
-    except Exception as e:
-        print(f"[LLM] 로드 실패, 규칙기반으로 대체: {e}")
-        llm = None
+        from modules.llm_module import LLMEngine
+        _HAVE_LLM = True
+    except Exception:
+        _HAVE_LLM = False
+
+    # STT: faster-whisper (CPU int8 기본)
+    stt = WhisperSTT(model_size="small", device="cpu", compute_type="int8")
+
+    # LLM: 있으면 사용, 없으면 규칙기반
+    llm = None
+    if _HAVE_LLM:
+        try:
+            llm = LLMEngine(model_name="skt/kogpt2-base-v2")  # 원하면 바꿔도 됨
+        except Exception as e:
+            print(f"[LLM] 로드 실패, 규칙기반으로 대체: {e}")
+            llm = None
 
-# TTS: Edge-TTS
-tts = EdgeTTSWrapper(output_dir=TTS_DIR, voice="ko-KR-SunHiNeural", rate="+0%", pitch="+0%")
+    # TTS: Edge-TTS
+    tts = EdgeTTSWrapper(output_dir=TTS_DIR, voice="ko-KR-SunHiNeural", rate="+0%", pitch="+0%")
 
 # -----------------------------
 # 유틸
 # -----------------------------
-def simple_rule_reply(user_text: str, lang: str) -> str:
-    if lang and lang.startswith("ko"):
-        if "안녕" in user_text:
-            return "안녕하세요! 만나서 반가워요."
-        if "고마" in user_text or "감사" in user_text:
-            return "별말씀을요. 도움이 되어서 기뻐요."
-        return f"'{user_text}' 라고 하셨군요."
-    else:
-        ut = user_text.lower()
-        if "hello" in ut:
-            return "Hello! Nice to meet you."
-        if "thanks" in ut or "thank you" in ut:
-            return "You're welcome!"
-        return f"You said: '{user_text}'."
-
-def synthesize_to_bytes(text: str) -> bytes:
+def synthesize_to_bytes(text: str):
     """
-    EdgeTTSWrapper는 파일을 만드니, 만들어진 파일을 읽어서 bytes 반환.
+    EdgeTTSWrapper는 파일을 만드니, 만들어진 파일을 읽어서 (bytes, mimetype) 반환.
     (WS 전용이라 별도 HTTP 서버 없이 전송하기 위함)
     """
-    wav_path = tts.synthesize(text)  # Path 반환
-    with open(wav_path, "rb") as f:
-        return f.read()
+    audio_path = tts.synthesize(text)  # Path 반환 (mp3)
+    with open(audio_path, "rb") as f:
+        return f.read(), mimetype_for(audio_path)
 
 async def send_json(ws, payload: dict):
     await ws.send(json.dumps(payload, ensure_ascii=False))
@@ -151,12 +149,12 @@ class VoiceSession:
 
                 # TTS (bytes -> base64)
                 try:
-                    wav_bytes = synthesize_to_bytes(reply)
-                    audio_b64 = base64.b64encode(wav_bytes).decode("ascii")
+                    audio_bytes, mime = synthesize_to_bytes(reply)
+                    audio_b64 = base64.b64encode(audio_bytes).decode("ascii")
                     send_safe({
                         "type": "tts",
                         "ok": True,
-                        "mime": "audio/wav",
+                        "mime": mime,
                         "audio_b64": audio_b64,
                         "reply": reply,
                         "language": lang
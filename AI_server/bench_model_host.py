@@ -0,0 +1,133 @@
+# D:/AI/AICompanion/ai_server/bench_model_host.py
+"""
+모델 호스트 벤치마크 (ai_model_host.py가 떠 있어야 함).
+- 실제 프런트 서버(ai_server.py 등)를 로컬 모델 모드 / 호스트 모드로 각각 띄워 RSS 비교
+  (프로세스 트리 합계, Flask 디버그 리로더 자식 포함) -> 프런트 서버 1개당 절약되는 메모리
+- ping, shared memory 오디오 왕복의 호출당 IPC 오버헤드
+- 한 연결에서 여러 스레드가 동시에 요청할 때 처리량 (멀티플렉싱)
+  python bench_model_host.py [--socket ...] [--calls 500] [--audio-sec 5] [--stt]
+                             [--frontend ai_server.py --frontend ai_server_ws.py]
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from modules.model_host import ModelHostClient, DEFAULT_SOCKET, rss_bytes
+
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+def mb(n):
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def timed(fn, calls):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - t0) / calls
+
+
+def tree_rss(pid: int) -> int:
+    """pid와 모든 자손 프로세스의 RSS 합"""
+    total = rss_bytes(pid)
+    for task in Path(f"/proc/{pid}/task").glob("*"):
+        try:
+            children = (task / "children").read_text().split()
+        except OSError:
+            continue
+        for child in children:
+            total += tree_rss(int(child))
+    return total
+
+
+def frontend_rss(script: str, socket_path, max_wait: float) -> int:
+    """
+    프런트 서버를 띄우고 RSS가 안정될 때까지(모델 로드 완료) 기다린 뒤 측정하고 종료.
+    socket_path가 None이면 로컬 모델 모드.
+    """
+    env = dict(os.environ)
+    env.pop("AI_MODEL_HOST_SOCKET", None)
+    if socket_path:
+        env["AI_MODEL_HOST_SOCKET"] = socket_path
+    proc = subprocess.Popen(
+        [sys.executable, script], cwd=BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,  # 리로더 자식까지 한 번에 종료
+    )
+    try:
+        deadline = time.time() + max_wait
+        last, stable = 0, 0
+        while time.time() < deadline and stable < 3:
+            time.sleep(1.0)
+            if proc.poll() is not None:
+                raise RuntimeError(f"{script} exited with code {proc.returncode}")
+            cur = tree_rss(proc.pid)
+            stable = stable + 1 if last and abs(cur - last) < last * 0.01 else 0
+            last = cur
+        return last
+    finally:
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        proc.wait(timeout=10)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--socket", default=DEFAULT_SOCKET)
+    ap.add_argument("--calls", type=int, default=500)
+    ap.add_argument("--audio-sec", type=float, default=5.0)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--stt", action="store_true", help="실제 STT 호출 시간도 측정")
+    ap.add_argument("--frontend", action="append", default=[],
+                    help="RSS를 비교할 프런트 서버 스크립트 (예: ai_server.py, 여러 번 지정 가능)")
+    ap.add_argument("--frontend-wait", type=float, default=120.0, help="프런트 모델 로드 최대 대기(초)")
+    args = ap.parse_args()
+
+    client = ModelHostClient(args.socket)
+    info = client.call("info")
+    print(f"[Memory] host RSS (models loaded once) : {mb(info['rss'])}")
+    for script in args.frontend:
+        local = frontend_rss(script, None, args.frontend_wait)
+        hosted = frontend_rss(script, args.socket, args.frontend_wait)
+        print(f"[Memory] {script} local models      : {mb(local)}")
+        print(f"[Memory] {script} via model host    : {mb(hosted)}")
+        print(f"[Memory] {script} saved per instance: {mb(local - hosted)}")
+
+    audio = (np.random.randn(int(16000 * args.audio_sec)) * 3000).astype(np.int16)
+
+    ping = timed(lambda: client.call("ping"), args.calls)
+    print(f"[IPC] ping round trip                 : {ping * 1e6:.0f} us/call")
+
+    shm = timed(lambda: client.call_with_audio("audio_stats", audio), args.calls)
+    print(f"[IPC] audio via shared memory          : {shm * 1e6:.0f} us/call "
+          f"({args.audio_sec:g}s, {audio.nbytes} bytes)")
+
+    n = args.calls
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as ex:
+        list(ex.map(lambda _: client.call("ping"), range(n)))
+    dt = time.perf_counter() - t0
+    print(f"[IPC] multiplexed ping ({args.threads} threads)   : {n / dt:.0f} calls/s")
+
+    if args.stt:
+        t = timed(lambda: client.stt.transcribe_numpy(audio, samplerate=16000), 3)
+        print(f"[STT] remote transcribe ({args.audio_sec:g}s)       : {t * 1e3:.0f} ms/call "
+              f"(IPC share ~{shm / t * 100:.2f}%)")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
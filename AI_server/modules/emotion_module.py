@@ -0,0 +1,100 @@
+import re
+import queue
+import threading
+from concurrent.futures import Future
+
+
+# 감정 라벨은 node_controller/emotionMapper.js 기준 (joy / sadness / 그 외 neutral)
+EMOTION_LEXICON = {
+    "joy": [
+        "좋아", "좋다", "좋은", "기뻐", "기쁘", "행복", "신나", "최고", "재밌", "재미있", "반가", "고마", "감사", "사랑", "ㅋㅋ", "ㅎㅎ",
+        "happy", "glad", "great", "love", "awesome", "fun", "nice", "thanks", "thank you", "hello", "haha", "lol",
+    ],
+    "sadness": [
+        "슬퍼", "슬프", "우울", "힘들", "외로", "아파", "아프", "속상", "눈물", "미안", "피곤", "지쳤", "ㅠ", "ㅜ",
+        "sad", "unhappy", "depressed", "lonely", "tired", "sorry", "cry", "hurt", "miss you",
+    ],
+}
+
+
+class LexiconEmotionClassifier:
+    """
+    CPU 전용 초경량 감정 분류기 (키워드 매칭 점수).
+    - 영어 단어는 단어 경계로 매칭 ("fun" != "function"), 한글 어간/자모는 부분 문자열
+    - 점수가 같은 라벨이 여럿이면 default(neutral)
+    - predict_batch(texts) -> ["joy" | "sadness" | "neutral", ...]
+    """
+    def __init__(self, lexicon=None, default="neutral"):
+        self.lexicon = lexicon or EMOTION_LEXICON
+        self.default = default
+        # label -> (영어 단어 정규식 | None, 한글 키워드 목록)
+        self._matchers = {}
+        for label, words in self.lexicon.items():
+            english = [w for w in words if w.isascii()]
+            korean = [w for w in words if not w.isascii()]
+            pattern = None
+            if english:
+                alts = "|".join(re.escape(w) for w in sorted(english, key=len, reverse=True))
+                pattern = re.compile(rf"\b(?:{alts})\b", re.IGNORECASE)
+            self._matchers[label] = (pattern, korean)
+
+    def _predict_one(self, text: str) -> str:
+        t = text or ""
+        scores = {}
+        for label, (pattern, korean) in self._matchers.items():
+            score = sum(t.count(w) for w in korean)
+            if pattern is not None:
+                score += len(pattern.findall(t))
+            scores[label] = score
+
+        best_score = max(scores.values(), default=0)
+        best = [label for label, score in scores.items() if score == best_score]
+        if best_score == 0 or len(best) > 1:
+            return self.default
+        return best[0]
+
+    def predict_batch(self, texts):
+        return [self._predict_one(t) for t in texts]
+
+
+class EmotionBatcher:
+    """
+    여러 요청의 감정 분류를 한 번에 모아서 처리하는 워커 스레드.
+    - submit(text) -> Future (바로 반환, 답변 생성과 동시에 진행)
+    - max_batch개가 모이거나 max_wait_sec가 지나면 predict_batch() 1회 호출
+    """
+    def __init__(self, classifier=None, max_batch=32, max_wait_sec=0.01):
+        self.classifier = classifier or LexiconEmotionClassifier()
+        self.max_batch = int(max_batch)
+        self.max_wait_sec = float(max_wait_sec)
+        self.q = queue.Queue()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, text: str) -> Future:
+        fut = Future()
+        self.q.put((text, fut))
+        return fut
+
+    def classify(self, text: str, timeout=None) -> str:
+        return self.submit(text).result(timeout=timeout)
+
+    def _loop(self):
+        while True:
+            batch = [self.q.get()]
+            # 첫 요청 이후 잠깐 기다리며 동시 요청을 모음
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self.q.get(timeout=self.max_wait_sec))
+            except queue.Empty:
+                pass
+
+            texts = [t for t, _ in batch]
+            try:
+                labels = self.classifier.predict_batch(texts)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), label in zip(batch, labels):
+                fut.set_result(label)
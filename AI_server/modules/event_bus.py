@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import deque
+
+
+class Subscription:
+    """
+    구독자 1명의 버퍼 (크기 제한).
+    - 가득 차면 가장 오래된 이벤트를 버림 -> 느린 구독자가 발행 쪽을 막지 않음
+    - 버린 자리에는 "reset" 이벤트(dropped=버린 개수)를 남겨 클라이언트가 누락을 알 수 있게 함
+    """
+    def __init__(self, bus, maxsize=64):
+        self.bus = bus
+        self.maxsize = max(int(maxsize), 2)  # reset 표시 + 이벤트 1개는 들어가야 함
+        self.buf = deque()
+        self.cond = threading.Condition()
+        self.dropped = 0
+
+    def _evict(self, seq: int):
+        # 맨 앞의 reset 표시는 유지(갱신)하고 그 다음 가장 오래된 이벤트를 버림
+        marker = self.buf.popleft() if self.buf[0]["type"] == "reset" else None
+        lost = self.buf.popleft()
+        self.dropped += 1
+        if marker is None:
+            marker = {"type": "reset", "dropped": 0}
+        marker.update({
+            "id": lost["id"],  # SSE lastEventId가 버려진 마지막 이벤트를 가리키도록
+            "ts": time.time(),
+            "last_event_id": seq,
+            "dropped": marker.get("dropped", 0) + 1,
+        })
+        self.buf.appendleft(marker)
+
+    def _push(self, event):
+        # bus.lock 안에서만 호출됨 (발행자끼리 경쟁 없음)
+        with self.cond:
+            while len(self.buf) >= self.maxsize:
+                self._evict(event["id"])
+            self.buf.append(event)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """다음 이벤트 (timeout이면 None)"""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.buf, timeout=timeout):
+                return None
+            return self.buf.popleft()
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    단계 이벤트(speech_start, transcript, reply, tts ...)를 여러 구독자에게 push.
+    - publish()는 절대 블로킹하지 않음
+    - 최근 history개는 보관 -> 재접속(Last-Event-ID)이나 long-poll에서 이어받기
+    """
+    def __init__(self, history=256, subscriber_maxsize=64):
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.history = deque(maxlen=history)
+        self.subscriber_maxsize = subscriber_maxsize
+        self.subscribers = set()
+        self.seq = 0
+
+    def publish(self, event_type: str, **data) -> dict:
+        with self.lock:
+            self.seq += 1
+            event = {"id": self.seq, "type": event_type, "ts": time.time(), **data}
+            self.history.append(event)
+            for sub in self.subscribers:
+                sub._push(event)
+            self.cond.notify_all()
+        return event
+
+    def _is_gap(self, last_id: int) -> bool:
+        """
+        last_id부터 이어받을 수 없는 경우 (self.lock 안에서 호출)
+        - last_id > seq: 서버 재시작 등으로 id가 초기화됨
+        - last_id가 history보다 오래됨: 중간 이벤트가 이미 밀려남
+        """
+        if last_id > self.seq:
+            return True
+        return bool(self.history) and last_id < self.history[0]["id"] - 1
+
+    def subscribe(self, last_id=None) -> Subscription:
+        """
+        last_id를 주면 그 이후 이벤트를 먼저 채워줌.
+        이어받을 수 없으면 (또는 구독자 버퍼보다 많으면) "reset" 이벤트 뒤에 최근 이벤트만 보냄.
+        """
+        sub = Subscription(self, maxsize=self.subscriber_maxsize)
+        with self.lock:
+            if last_id is not None:
+                gap = self._is_gap(last_id)
+                missed = list(self.history) if gap else [e for e in self.history if e["id"] > last_id]
+                if gap or len(missed) > self.subscriber_maxsize:
+                    # reset이 버퍼에서 밀려나지 않도록 한 칸 남김
+                    missed = missed[len(missed) - (self.subscriber_maxsize - 1):] if self.subscriber_maxsize > 1 else []
+                    reset_id = missed[0]["id"] - 1 if missed else self.seq
+                    sub._push({"id": reset_id, "type": "reset", "ts": time.time(), "last_event_id": self.seq})
+                for event in missed:
+                    sub._push(event)
+            self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self.lock:
+            self.subscribers.discard(sub)
+
+    def events_after(self, last_id: int, timeout=None):
+        """
+        long-poll용: last_id 이후 이벤트가 생길 때까지 최대 timeout초 대기.
+        -> (events, gap). 이어받을 수 없으면 기다리지 않고 history 전체와 gap=True
+        """
+        with self.cond:
+            if self._is_gap(last_id):
+                return list(self.history), True
+            self.cond.wait_for(lambda: self.seq > last_id, timeout=timeout)
+            return [e for e in self.history if e["id"] > last_id], False
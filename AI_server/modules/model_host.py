@@ -0,0 +1,396 @@
+# D:/AI/AICompanion/ai_server/modules/model_host.py
+"""
+호스트 공용 모델 서버 (STT / LLM / TTS 1회 로드).
+
+- ai_server.py, ai_server_ws.py가 각자 모델을 올리지 않고 Unix 도메인 소켓으로 빌려 씀
+- 메시지: 4바이트 길이(big-endian) + JSON, 요청마다 "id"를 붙여 한 연결에서 여러 요청 동시 처리
+- 오디오(int16 PCM)는 직렬화하지 않고 shared memory 이름만 넘김 (STT도 파일 없이 메모리에서 처리)
+"""
+import os
+import json
+import socket
+import struct
+import threading
+import itertools
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+DEFAULT_SOCKET = os.environ.get("AI_MODEL_HOST_SOCKET", "/tmp/ai_companion_models.sock")
+
+_HEADER = struct.Struct(">I")
+
+
+# -----------------------------
+# 프레이밍
+# -----------------------------
+def _send_msg(sock, payload: dict):
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock, n: int):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv_msg(sock):
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    data = _recv_exact(sock, _HEADER.unpack(header)[0])
+    if data is None:
+        return None
+    return json.loads(data.decode("utf-8"))
+
+
+def _attach_shm(name: str) -> shared_memory.SharedMemory:
+    """
+    다른 프로세스가 만든 블록에 붙기만 함.
+    (3.13 미만은 resource_tracker가 종료 시 unlink하려 하므로 등록 해제)
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+def rss_bytes(pid="self") -> int:
+    """프로세스 RSS (Linux /proc 기준, 없으면 0). 기본은 현재 프로세스"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+# -----------------------------
+# 서버 (데몬)
+# -----------------------------
+class ModelHostServer:
+    """
+    엔진을 한 번만 로드하고 소켓으로 서비스.
+    - stt / tts는 필수, llm은 llm_model을 줬을 때만 로드
+    - 연결마다 reader 스레드 1개, 실제 작업은 공용 스레드풀에서 실행
+    """
+    def __init__(
+        self,
+        socket_path: str = DEFAULT_SOCKET,
+        tts_dir: Path = None,
+        model_size: str = "small",
+        device: str = "cpu",
+        compute_type: str = "int8",
+        llm_model: str = None,
+        max_workers: int = 4,
+    ):
+        from .stt_module import WhisperSTT
+        from .tts_edge import EdgeTTSWrapper
+
+        self.socket_path = socket_path
+        self.stt = WhisperSTT(model_size=model_size, device=device, compute_type=compute_type)
+        self.tts = EdgeTTSWrapper(output_dir=tts_dir, voice="ko-KR-SunHiNeural", rate="+0%", pitch="+0%")
+        self.llm = None
+        self.llm_lock = threading.Lock()  # generate()는 동시 호출하지 않음
+        if llm_model:
+            try:
+                from .llm_module import LocalLLM
+                self.llm = LocalLLM(model_name=llm_model)
+            except Exception as e:
+                print(f"[ModelHost] LLM 로드 실패, 제외하고 시작: {e}")
+                self.llm = None
+
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.handlers = {
+            "info": self._op_info,
+            "ping": self._op_ping,
+            "audio_stats": self._op_audio_stats,
+            "stt": self._op_stt,
+            "llm": self._op_llm,
+            "tts": self._op_tts,
+        }
+        self.sock = None
+
+    # --- ops ---
+    def _op_info(self, req):
+        return {
+            "stt": True, "llm": self.llm is not None, "tts": True, "tts_formats": self.tts.formats,
+            "rss": rss_bytes(), "pid": os.getpid(),
+        }
+
+    def _op_ping(self, req):
+        return {}
+
+    def _op_audio_stats(self, req):
+        # 모델 없이 shared memory 왕복 비용만 재기 위한 op (벤치마크용)
+        shm = _attach_shm(req["shm"])
+        try:
+            audio = np.ndarray((req["n"],), dtype=np.int16, buffer=shm.buf)
+            peak = int(np.abs(audio).max()) if len(audio) else 0
+            del audio
+        finally:
+            shm.close()
+        return {"n": req["n"], "peak": peak}
+
+    def _op_stt(self, req):
+        shm = _attach_shm(req["shm"])
+        try:
+            audio = np.ndarray((req["n"],), dtype=np.int16, buffer=shm.buf)
+            text, lang = self.stt.transcribe_numpy(audio, samplerate=req.get("samplerate", 16000))
+            del audio
+        finally:
+            shm.close()
+        return {"text": text, "language": lang}
+
+    def _op_llm(self, req):
+        if self.llm is None:
+            raise RuntimeError("LLM not loaded on model host")
+        with self.llm_lock:
+            return {"reply": self.llm.generate_reply(req["text"])}
+
+    def _op_tts(self, req):
+        out_path = self.tts.synthesize(req["text"], fmt=req.get("fmt"))
+        return {"path": str(out_path)}
+
+    # --- 연결 처리 ---
+    def _run(self, conn, send_lock, req):
+        try:
+            handler = self.handlers.get(req.get("op"))
+            if handler is None:
+                raise ValueError(f"unknown op: {req.get('op')}")
+            resp = {"id": req.get("id"), "ok": True, **handler(req)}
+        except Exception as e:
+            resp = {"id": req.get("id"), "ok": False, "error": str(e)}
+        try:
+            with send_lock:
+                _send_msg(conn, resp)
+        except OSError:
+            pass  # 클라이언트가 먼저 끊음
+
+    def _serve_conn(self, conn):
+        send_lock = threading.Lock()
+        try:
+            while True:
+                req = _recv_msg(conn)
+                if req is None:
+                    break
+                self.pool.submit(self._run, conn, send_lock, req)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def _remove_stale_socket(self):
+        """남아 있는 소켓 파일이 살아있는 호스트 것이면 거부, 죽은 것이면 삭제"""
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)  # 응답 없음 -> 이전 데몬의 잔재
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"another model host is already listening on {self.socket_path}")
+
+    def serve_forever(self):
+        self._remove_stale_socket()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # bind 시점부터 소유자만 접근 가능하도록 (chmod 전 틈 없음)
+        old_umask = os.umask(0o177)
+        try:
+            self.sock.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        self.sock.listen()
+        print(f"[ModelHost] Listening on {self.socket_path} (pid={os.getpid()}, llm={self.llm is not None})")
+        try:
+            while True:
+                conn, _ = self.sock.accept()
+                threading.Thread(target=self._serve_conn, args=(conn,), daemon=True).start()
+        finally:
+            self.sock.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+# -----------------------------
+# 클라이언트 (프런트 서버 쪽)
+# -----------------------------
+class _Connection:
+    """
+    소켓 1개 + 그 위에서 응답을 기다리는 요청들.
+    - reader가 끝나면 closed=True, 이후 submit은 즉시 ConnectionError
+    - closed 확인과 pending 등록을 같은 lock 안에서 하므로 응답 없이 매달리는 요청이 없음
+    """
+    def __init__(self, socket_path: str):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path)
+        self.send_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.closed = False
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    def _read_loop(self):
+        err = ConnectionError("model host disconnected")
+        try:
+            while True:
+                resp = _recv_msg(self.sock)
+                if resp is None:
+                    break
+                with self.lock:
+                    fut = self.pending.pop(resp.get("id"), None)
+                if fut is None:
+                    continue
+                if resp.get("ok"):
+                    fut.set_result(resp)
+                else:
+                    fut.set_exception(RuntimeError(resp.get("error", "model host error")))
+        except OSError as e:
+            err = ConnectionError(f"model host disconnected: {e}")
+        finally:
+            self._fail_all(err)
+
+    def _fail_all(self, err):
+        with self.lock:
+            self.closed = True
+            pending, self.pending = self.pending, {}
+        for fut in pending.values():
+            fut.set_exception(err)
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def submit(self, req_id: int, payload: dict) -> Future:
+        fut = Future()
+        with self.lock:
+            if self.closed:
+                raise ConnectionError("model host disconnected")
+            self.pending[req_id] = fut
+        try:
+            with self.send_lock:
+                _send_msg(self.sock, {"id": req_id, **payload})
+        except OSError as e:
+            with self.lock:
+                self.pending.pop(req_id, None)
+            self._fail_all(ConnectionError(f"model host disconnected: {e}"))
+            raise ConnectionError(f"model host disconnected: {e}") from e
+        return fut
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._fail_all(ConnectionError("client closed"))
+
+
+class ModelHostClient:
+    """
+    한 소켓 연결을 여러 스레드가 공유 (요청 id로 응답 매칭).
+    - call(op, **kw) -> dict (블로킹), submit(op, **kw) -> Future
+    - 호스트가 재시작되면 다음 요청에서 자동 재접속 (끊길 때 진행 중이던 요청은 ConnectionError)
+    - .stt / .llm / .tts 는 로컬 엔진과 같은 메서드를 가진 프록시 (llm은 호스트에 없으면 None)
+    """
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 120.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.ids = itertools.count(1)
+        self.conn_lock = threading.Lock()
+        self.conn = _Connection(socket_path)
+
+        info = self.call("info")
+        self.stt = RemoteSTT(self)
+        self.tts = RemoteTTS(self, formats=info.get("tts_formats", ["mp3"]))
+        self.llm = RemoteLLM(self) if info.get("llm") else None
+
+    def _connection(self) -> _Connection:
+        with self.conn_lock:
+            if self.conn is None or self.conn.closed:
+                self.conn = _Connection(self.socket_path)
+            return self.conn
+
+    def submit(self, op: str, **kw) -> Future:
+        payload = {"op": op, **kw}
+        try:
+            return self._connection().submit(next(self.ids), payload)
+        except ConnectionError:
+            # 끊긴 걸 아직 몰랐던 경우: 새 연결로 한 번만 재시도
+            return self._connection().submit(next(self.ids), payload)
+
+    def call(self, op: str, **kw) -> dict:
+        return self.submit(op, **kw).result(timeout=self.timeout)
+
+    def call_with_audio(self, op: str, audio_int16: np.ndarray, **kw) -> dict:
+        """오디오를 shared memory에 한 번 복사하고 이름만 전달 (응답 후 해제)"""
+        audio_int16 = np.ascontiguousarray(audio_int16, dtype=np.int16).reshape(-1)
+        shm = shared_memory.SharedMemory(create=True, size=max(audio_int16.nbytes, 1))
+        try:
+            view = np.ndarray(audio_int16.shape, dtype=np.int16, buffer=shm.buf)
+            view[:] = audio_int16
+            del view
+            return self.call(op, shm=shm.name, n=int(audio_int16.shape[0]), **kw)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        with self.conn_lock:
+            conn, self.conn = self.conn, None
+        if conn:
+            conn.close()
+
+
+class RemoteSTT:
+    """WhisperSTT와 같은 인터페이스"""
+    def __init__(self, client: ModelHostClient):
+        self.client = client
+
+    def transcribe_numpy(self, audio_int16: np.ndarray, samplerate=16000):
+        resp = self.client.call_with_audio("stt", audio_int16, samplerate=samplerate)
+        return resp["text"], resp["language"]
+
+    def record_and_transcribe(self, duration=5, samplerate=16000):
+        # 녹음은 마이크가 있는 이 프로세스에서, 변환만 호스트에서
+        import sounddevice as sd
+        audio = sd.rec(int(duration * samplerate), samplerate=samplerate, channels=1, dtype="int16")
+        sd.wait()
+        return self.transcribe_numpy(np.squeeze(audio), samplerate=samplerate)
+
+
+class RemoteLLM:
+    """LocalLLM과 같은 인터페이스"""
+    def __init__(self, client: ModelHostClient):
+        self.client = client
+
+    def generate_reply(self, user_text: str, lang_hint="ko"):
+        return self.client.call("llm", text=user_text)["reply"]
+
+
+class RemoteTTS:
+    """EdgeTTSWrapper와 같은 인터페이스 (파일은 호스트가 공용 tts_cache에 씀)"""
+    def __init__(self, client: ModelHostClient, formats=("mp3",)):
+        self.client = client
+        self.formats = list(formats)
+
+    def synthesize(self, text: str, fmt: str = "mp3") -> Path:
+        return Path(self.client.call("tts", text=text, fmt=fmt)["path"])
@@ -0,0 +1,17 @@
+def simple_rule_reply(user_text: str, lang: str) -> str:
+    """
+    LLM 없이 쓰는 규칙기반 답변 (ai_server.py / ai_server_ws.py 공용)
+    """
+    if lang and lang.startswith("ko"):
+        if "안녕" in user_text:
+            return "안녕하세요! 만나서 반가워요."
+        if "고마" in user_text or "감사" in user_text:
+            return "별말씀을요. 도움이 되어서 기뻐요."
+        return f"'{user_text}' 라고 하셨군요."
+    else:
+        ut = user_text.lower()
+        if "hello" in ut:
+            return "Hello! Nice to meet you."
+        if "thanks" in ut or "thank you" in ut:
+            return "You're welcome!"
+        return f"You said: '{user_text}'."
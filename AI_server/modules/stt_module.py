@@ -1,7 +1,7 @@
+import io
 import queue
 import time
 import wave
-import tempfile
 from pathlib import Path
 
 import numpy as np
@@ -13,30 +13,33 @@ try:
 except Exception:
     _HAVE_VAD = False
 
-from faster_whisper import WhisperModel
-
 
 class WhisperSTT:
     def __init__(self, model_size="small", device="cpu", compute_type="int8"):
+        # faster_whisper(ctranslate2)는 무거우므로 실제로 모델을 올릴 때만 import
+        # -> RealtimeSpeechEngine만 쓰는 프로세스(모델 호스트 사용 중인 프런트)는 로드 안 함
+        from faster_whisper import WhisperModel
         self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
 
-    def _transcribe_wav_path(self, wav_path: str):
-        segments, info = self.model.transcribe(wav_path, language=None)
+    def _transcribe(self, audio):
+        # audio: wav 경로 또는 file-like (faster-whisper가 디코딩/리샘플)
+        segments, info = self.model.transcribe(audio, language=None)
         text = " ".join([seg.text for seg in segments]).strip()
         return text, (info.language or "auto")
 
     def transcribe_numpy(self, audio_int16: np.ndarray, samplerate=16000):
         """
         numpy int16 PCM → Whisper 변환
+        임시 파일 대신 메모리(BytesIO)에 wav로 써서 넘김 -> 16kHz 변환은 faster-whisper 리샘플러가 처리
         """
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmpfile:
-            with wave.open(tmpfile.name, "wb") as wf:
-                wf.setnchannels(1)
-                wf.setsampwidth(2)  # int16
-                wf.setframerate(samplerate)
-                wf.writeframes(audio_int16.tobytes())
-            tmp_wav = tmpfile.name
-        return self._transcribe_wav_path(tmp_wav)
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)  # int16
+            wf.setframerate(samplerate)
+            wf.writeframes(np.asarray(audio_int16, dtype=np.int16).tobytes())
+        buf.seek(0)
+        return self._transcribe(buf)
 
     def record_and_transcribe(self, duration=5, samplerate=16000):
         """
@@ -51,8 +54,9 @@ class WhisperSTT:
 
 # --- 실시간 엔진: webrtcvad(있으면) 또는 RMS 침묵 감지 ---
 class RealtimeSpeechEngine:
-    def __init__(self, samplerate=16000, vad_mode="auto", min_utt_sec=1.5, end_silence_sec=1.0):
+    def __init__(self, samplerate=16000, vad_mode="auto", min_utt_sec=1.5, end_silence_sec=1.0, on_speech_start=None):
         self.samplerate = samplerate
+        self.on_speech_start = on_speech_start  # 발화 시작 감지 시 호출 (인자 없음)
         self.min_utt_sec = float(min_utt_sec)
         self.end_silence_sec = float(end_silence_sec)
         self.q = queue.Queue()
@@ -163,6 +167,8 @@ class RealtimeSpeechEngine:
                     if not voiced_started:
                         voiced_started = True
                         voiced_start_time = time.time()
+                        if self.on_speech_start:
+                            self.on_speech_start()
                     collected.append(sub)
                     last_voice_time = time.time()
                 else:
@@ -1,15 +1,40 @@
 # D:/AI/AICompanion/ai_server/modules/tts_edge.py
 import uuid
+import shutil
 import asyncio
+import subprocess
 from pathlib import Path
 import edge_tts
 
 
+# 클라이언트가 고를 수 있는 출력 포맷: 이름 -> (확장자, mimetype)
+# - edge-tts는 항상 audio-24khz-48kbitrate-mono-mp3 (약 6KB/s) 만 내려줌
+# - opus(Ogg, 더 작음) / wav(PCM 24kHz, 약 48KB/s)는 ffmpeg가 있을 때만 mp3를 변환해서 제공
+OUTPUT_FORMATS = {
+    "mp3": (".mp3", "audio/mpeg"),
+    "opus": (".ogg", "audio/ogg"),
+    "wav": (".wav", "audio/wav"),
+}
+
+# ffmpeg 변환 인자 (mp3 -> 각 포맷)
+_FFMPEG_ARGS = {
+    "opus": ["-c:a", "libopus", "-b:a", "24k"],
+    "wav": ["-c:a", "pcm_s16le"],
+}
+
+_MIMETYPES = {ext: mime for ext, mime in OUTPUT_FORMATS.values()}
+
+
+def mimetype_for(path: Path) -> str:
+    """확장자로 mimetype 결정 (모르면 mp3로 간주)"""
+    return _MIMETYPES.get(Path(path).suffix.lower(), "audio/mpeg")
+
+
 class EdgeTTSWrapper:
     """
     Edge TTS 간단 래퍼.
     - 기본 한국어 여성: ko-KR-SunHiNeural (자연스러움·명료함)
-    - WAV 출력(riff-24khz-16bit-mono-pcm)
+    - 기본 MP3 출력 (edge-tts 고정), ffmpeg가 있으면 synthesize(fmt="opus"|"wav")로 변환
     """
     def __init__(
         self,
@@ -17,14 +42,21 @@ class EdgeTTSWrapper:
         voice: str = "ko-KR-SunHiNeural",
         rate: str = "+0%",
         pitch: str = "+0%",
-        audio_format: str = "riff-24khz-16bit-mono-pcm",
+        ffmpeg: str = None,
+        transcode_timeout: float = 30.0,
     ):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.voice = voice
         self.rate = rate
         self.pitch = pitch
-        self.audio_format = audio_format
+        self.ffmpeg = ffmpeg or shutil.which("ffmpeg")
+        self.transcode_timeout = transcode_timeout
+
+    @property
+    def formats(self):
+        """실제로 만들 수 있는 포맷 이름 목록"""
+        return ["mp3"] + (list(_FFMPEG_ARGS) if self.ffmpeg else [])
 
     async def _synthesize_async(self, text: str, out_path: Path):
         tts = edge_tts.Communicate(
@@ -33,11 +65,39 @@ class EdgeTTSWrapper:
             rate=self.rate,
             pitch=self.pitch,
         )
-        # audio_format은 save()에 넘겨야 적용됨
-        await tts.save(str(out_path), audio_format=self.audio_format)
+        await tts.save(str(out_path))
+
+    def _transcode(self, src: Path, fmt: str) -> Path:
+        dst = src.with_suffix(OUTPUT_FORMATS[fmt][0])
+        try:
+            subprocess.run(
+                [self.ffmpeg, "-y", "-loglevel", "error", "-i", str(src), *_FFMPEG_ARGS[fmt], str(dst)],
+                check=True,
+                capture_output=True,
+                timeout=self.transcode_timeout,
+            )
+        except subprocess.CalledProcessError as e:
+            dst.unlink(missing_ok=True)  # 쓰다 만 파일 제거
+            stderr = (e.stderr or b"").decode("utf-8", "replace").strip()
+            raise RuntimeError(f"ffmpeg {fmt} 변환 실패: {stderr or e}") from e
+        except subprocess.TimeoutExpired as e:
+            dst.unlink(missing_ok=True)
+            raise RuntimeError(f"ffmpeg {fmt} 변환 시간 초과 ({self.transcode_timeout}s)") from e
+        finally:
+            src.unlink(missing_ok=True)
+        return dst
+
+    def synthesize(self, text: str, fmt: str = "mp3") -> Path:
+        """
+        fmt: "mp3" | "opus" | "wav" (opus/wav는 ffmpeg 필요, self.formats 참고)
+        """
+        fmt = fmt or "mp3"
+        if fmt not in self.formats:
+            raise ValueError(f"unsupported TTS format: {fmt} (available: {', '.join(self.formats)})")
 
-    def synthesize(self, text: str) -> Path:
-        out_path = self.output_dir / f"{uuid.uuid4().hex}.wav"
+        out_path = self.output_dir / f"{uuid.uuid4().hex}.mp3"
         # Flask 스레드 내에서 간단히 실행
         asyncio.run(self._synthesize_async(text, out_path))
+        if fmt != "mp3":
+            out_path = self._transcode(out_path, fmt)
         return out_path